@@ -1,14 +1,42 @@
 import requests
-import pandas as pd
-import threading
-from queue import Queue
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import operator
+from urllib.parse import quote
 import re
 
+try:
+    from orjson import loads as _json_loads  # Faster parsing of TheMealDB's string-heavy payloads
+except ImportError:
+    from json import loads as _json_loads
+
 # Base URL for TheMealDB API
 API_BASE_URL = "https://www.themealdb.com/api/json/v1/1/search.php?s="
 
-# Thread-safe queue for storing API results
-results_queue = Queue()
+# TheMealDB lists ingredients from strIngredient1/strMeasure1 to strIngredient20/strMeasure20;
+# _get_ing_fields pulls all 40 values from a meal in a single call, interleaved
+_ING_KEYS = tuple(key for i in range(1, 21) for key in (f"strIngredient{i}", f"strMeasure{i}"))
+_get_ing_fields = operator.itemgetter(*_ING_KEYS)
+
+# Shared HTTP session so TCP/TLS connections to TheMealDB are reused across calls,
+# retrying transient connection errors and gateway failures with a short backoff
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=16,
+    # raise_on_status=False hands the last failed response back to raise_for_status()
+    max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504], raise_on_status=False),
+))
+
+# Bounded worker pool for fetching recipes concurrently
+_POOL = ThreadPoolExecutor(max_workers=8)
+
+# Meals found while validating, keyed by the normalized name of the matched meal,
+# so fetching a validated dish reuses them instead of searching TheMealDB again
+_validated_meals = {}
 
 # Known unit conversions (e.g., tablespoons to milliliters)
 unit_conversions = {
@@ -24,6 +52,9 @@ unit_conversions = {
     "kg": 1000, # Kilograms to grams
 }
 
+# Units whose conversions yield grams rather than milliliters
+mass_units = {"g", "kg", "oz", "lb"}
+
 # Logical units for common ingredients
 logical_units = {
     "parsley": "bunches",
@@ -50,30 +81,76 @@ cost_database = {
 
 # Dietary filters for ingredient exclusion
 dietary_filters = {
-    "vegan": ["milk", "butter", "eggs", "cheese", "cream"],
-    "gluten-free": ["flour", "wheat"],
+    "vegan": frozenset(["milk", "butter", "eggs", "cheese", "cream"]),
+    "gluten-free": frozenset(["flour", "wheat"]),
 }
 
-def validate_input(dish_name):
+# Precompiled patterns for parsing measures such as "1/2 cup + 2 tbsp"
+# _NUM_RE only captures known units (longest first, so "tbsp" wins over "tbs");
+# a unit followed by more letters, like "cups", is left unmatched as before
+_PLUS_RE = re.compile(r"\s*\+\s*")
+_NUM_RE = re.compile(
+    r"^([\d./]+)\s*(?:(" + "|".join(sorted(unit_conversions, key=len, reverse=True)) + r")(?![a-z]))?",
+    re.IGNORECASE | re.ASCII,
+)
+
+@functools.lru_cache(maxsize=512)
+def _raw_fetch(dish_norm):
+    """
+    Query TheMealDB for a normalized (stripped, lowercased) dish name.
+    Results are cached so validation and fetching share a single request;
+    errors are raised rather than returned so they are never cached.
+    """
+    url = f"{API_BASE_URL}{quote(dish_norm)}"
+    response = _SESSION.get(url, timeout=10)
+    response.raise_for_status()
+    try:
+        data = _json_loads(response.content)
+    except ValueError as e:
+        raise requests.exceptions.InvalidJSONError(f"Invalid JSON response: {e}", response=response) from e
+    return data.get('meals') or None
+
+def _lookup_meals(dish_norm):
+    """
+    Return the meals recorded for a validated dish name, or search TheMealDB.
+    """
+    meals = _validated_meals.get(dish_norm)
+    return meals if meals is not None else _raw_fetch(dish_norm)
+
+def _search_meals(dish_name):
+    """
+    Search TheMealDB for a dish name without printing anything.
+    Returns a (meals, error) pair so the search can run on worker threads.
+    """
+    try:
+        return _raw_fetch(dish_name.strip().lower()), None
+    except requests.RequestException as e:
+        return None, e
+
+def validate_input(dish_name, search_result=None):
     """
     Validate the user's dish input by checking its existence in TheMealDB API.
-    Fetches meals dynamically for the entered dish name.
+    Fetches meals dynamically for the entered dish name, unless a (meals, error)
+    pair from search_meals_parallel is passed in as search_result.
     """
+    meals, error = search_result if search_result is not None else _search_meals(dish_name)
     try:
-        url = f"{API_BASE_URL}{dish_name.strip()}"
-        response = requests.get(url, timeout=10)
-        if response.status_code == 200:
-            data = response.json()
-            meals = data.get('meals', [])
-            if meals:
-                print(f"'{dish_name}' is valid and matches '{meals[0]['strMeal']}'. Using '{meals[0]['strMeal']}'.")
-                return meals[0]["strMeal"]  # Return the actual matched meal name
-            else:
-                print(f"No close match found for '{dish_name}'. Please try again.")
-                return None
+        if error is not None:
+            raise error
+        if meals:
+            matched = meals[0]["strMeal"]
+            # A search for the matched name returns the meals whose names contain it,
+            # all of which are already in this (broader) result
+            matched_norm = matched.strip().lower()
+            _validated_meals[matched_norm] = [meal for meal in meals if matched_norm in meal["strMeal"].lower()]
+            print(f"'{dish_name}' is valid and matches '{matched}'. Using '{matched}'.")
+            return matched  # Return the actual matched meal name
         else:
-            print(f"Error: Received status code {response.status_code}. Please try again.")
+            print(f"No close match found for '{dish_name}'. Please try again.")
             return None
+    except requests.HTTPError as e:
+        print(f"Error: Received status code {e.response.status_code}. Please try again.")
+        return None
     except requests.RequestException as e:
         print(f"Error fetching data for validation: {e}")
         return None
@@ -81,44 +158,40 @@ def validate_input(dish_name):
 def fetch_recipe(dish_name):
     """
     Fetch recipe details for a given dish name from TheMealDB API.
-    Handles invalid responses and ensures thread-safe data handling.
+    Returns the list of matching meals, or None on an invalid response.
     """
     try:
-        url = f"{API_BASE_URL}{dish_name.strip()}"
-        response = requests.get(url, timeout=10)
-        if response.status_code == 200:
-            data = response.json()
-            meals = data.get('meals', [])
-            if meals:
-                results_queue.put({dish_name: meals})  # Add result to queue
-            else:
-                print(f"No data found for '{dish_name}'. Skipping.")
-                results_queue.put({dish_name: None})
-        else:
-            print(f"Error: Received status code {response.status_code} for '{dish_name}'.")
-            results_queue.put({dish_name: None})
+        meals = _lookup_meals(dish_name.strip().lower())
+        if meals:
+            return meals
+        print(f"No data found for '{dish_name}'. Skipping.")
+    except requests.HTTPError as e:
+        print(f"Error: Received status code {e.response.status_code} for '{dish_name}'.")
     except requests.RequestException as e:
         print(f"Error fetching data for '{dish_name}': {e}")
-        results_queue.put({dish_name: None})
+    return None
 
 def fetch_recipes_parallel(dish_names):
     """
-    Fetch recipes for multiple dish names in parallel using threads.
+    Fetch recipes for multiple dish names in parallel using a bounded thread pool.
+    All workers share the pooled session, so connections are reused.
     """
-    threads = []
-    for dish in dish_names:
-        thread = threading.Thread(target=fetch_recipe, args=(dish,))
-        threads.append(thread)
-        thread.start()
+    return dict(zip(dish_names, _POOL.map(fetch_recipe, dish_names)))
 
-    for thread in threads:
-        thread.join()  # Wait for all threads to complete
+def search_meals_parallel(dish_names):
+    """
+    Search for multiple dish names in parallel using the bounded thread pool.
+    Returns (meals, error) pairs in input order, to be passed to validate_input.
+    """
+    return list(_POOL.map(_search_meals, dish_names))
 
-    # Collect results from the queue
-    results = {}
-    while not results_queue.empty():
-        results.update(results_queue.get())
-    return results
+def _parse_num(number):
+    """
+    Convert a numeric string such as "2", "1.5" or "1/2" to a float.
+    Raises ValueError or ZeroDivisionError for malformed numbers.
+    """
+    numerator, _, denominator = number.partition("/")
+    return float(numerator) / float(denominator) if denominator else float(numerator)
 
 def parse_quantity(quantity, ingredient):
     """
@@ -127,15 +200,16 @@ def parse_quantity(quantity, ingredient):
     """
     total = 0
     unit = None
-    for part in re.split(r"\s*\+\s*", quantity):  # Split by '+'
+    for part in _PLUS_RE.split(quantity):  # Split by '+'
         try:
-            match = re.match(r"([\d./]+)\s*([a-zA-Z]*)", part)
+            match = _NUM_RE.match(part)
             if match:
-                value = eval(match.group(1))  # Evaluate fractions or floats
-                unit_part = match.group(2).lower()
-                if unit_part in unit_conversions:
+                value = _parse_num(match.group(1))  # Parse fractions or floats
+                unit_part = match.group(2)  # Only ever a known unit, or None
+                if unit_part:
+                    unit_part = unit_part.lower()
                     value *= unit_conversions[unit_part]
-                    unit = "grams" if unit_part in ["g", "kg", "oz", "lb"] else "milliliters"
+                    unit = "grams" if unit_part in mass_units else "milliliters"
                 total += value
         except Exception:
             continue  # Skip invalid parts
@@ -151,83 +225,87 @@ def consolidate_ingredients(recipes, filter_type=None):
     """
     Consolidate ingredients across multiple recipes into a single list.
     Apply dietary filters if specified.
+    Returns a dict mapping each ingredient to its total quantity and unit.
     """
-    ingredients_list = []
+    excluded_set = dietary_filters.get(filter_type, frozenset())
+    totals = defaultdict(float)
+    unit_counts = defaultdict(Counter)
+    found_ingredients = False
 
     for dish, meals in recipes.items():
         if not meals:
             print(f"No data found for {dish}. Skipping.")
             continue
         for meal in meals:
-            for i in range(1, 21):  # TheMealDB lists ingredients from strIngredient1 to strIngredient20
-                ingredient = meal.get(f"strIngredient{i}")
-                measure = meal.get(f"strMeasure{i}")
-                if ingredient and measure:
-                    ingredients_list.append({"Ingredient": ingredient.strip(), "Quantity": measure.strip()})
-
-    if not ingredients_list:
+            try:
+                fields = _get_ing_fields(meal)
+            except KeyError:  # Tolerate meals missing some of the ingredient keys
+                fields = tuple(meal.get(key) for key in _ING_KEYS)
+            for ingredient, measure in zip(fields[0::2], fields[1::2]):
+                if not (ingredient and measure):
+                    continue
+                found_ingredients = True
+                ingredient = ingredient.strip()
+                if ingredient.lower() in excluded_set:
+                    continue
+                quantity, unit = parse_quantity(measure.strip(), ingredient)
+                if quantity > 0:  # Skip entries with zero quantities
+                    totals[ingredient] += quantity
+                    unit_counts[ingredient][unit] += 1
+
+    if not found_ingredients:
         print("No valid ingredients were found.")
         return None  # Return None if no ingredients are found
 
-    # Create a DataFrame and parse numeric quantities
-    df = pd.DataFrame(ingredients_list)
-    df["Parsed Quantity"], df["Unit"] = zip(*df.apply(
-        lambda row: parse_quantity(row["Quantity"], row["Ingredient"]), axis=1
-    ))
-
-    # Remove rows with zero quantities
-    df = df[df["Parsed Quantity"] > 0]
+    # Combine entries with the same ingredient, using its most common unit
+    return {
+        ingredient: {
+            "Quantity": totals[ingredient],
+            "Unit": max(sorted(unit_counts[ingredient]), key=unit_counts[ingredient].get),
+        }
+        for ingredient in sorted(totals)
+    }
 
-    # Combine entries with the same ingredient
-    df_grouped = (
-        df.groupby("Ingredient", as_index=False)
-        .apply(lambda group: pd.Series({
-            "Quantity": group["Parsed Quantity"].sum(),
-            "Unit": group["Unit"].mode().iloc[0]
-        }))
-    )
-
-    # Apply dietary filters if specified
-    if filter_type:
-        excluded_ingredients = dietary_filters.get(filter_type, [])
-        df_grouped = df_grouped[~df_grouped["Ingredient"].str.lower().isin(excluded_ingredients)]
-
-    return df_grouped
-
-def calculate_costs(dataframe):
+def calculate_costs(grocery_list):
     """
     Calculate the estimated cost for each ingredient based on quantities.
     If an ingredient is missing from the cost database, assign a default value.
     """
     default_cost_per_unit = 0.10  # Default fallback cost per unit in USD
 
-    def get_cost(ingredient, quantity):
+    for ingredient, item in grocery_list.items():
         cost_per_unit = cost_database.get(ingredient.lower(), default_cost_per_unit)
-        return cost_per_unit * quantity
+        item["Cost"] = cost_per_unit * item["Quantity"]
+    return grocery_list
 
-    dataframe["Cost"] = dataframe.apply(
-        lambda row: get_cost(row["Ingredient"], row["Quantity"]), axis=1
-    )
-    return dataframe
-
-def format_output(dataframe):
+def format_output(grocery_list):
     """
     Format and display the consolidated grocery list with costs.
     """
-    dataframe = calculate_costs(dataframe)
+    grocery_list = calculate_costs(grocery_list)
 
     # Format Quantity to display integers as whole numbers and floats with up to 2 decimals
-    dataframe["Quantity"] = dataframe["Quantity"].apply(
-        lambda x: f"{int(x)}" if x.is_integer() else f"{x:.2f}"
-    )
-    dataframe["Cost"] = dataframe["Cost"].apply(lambda x: f"€{x:.2f}")
+    headers = ["Ingredient", "Quantity", "Unit", "Cost"]
+    rows = [
+        [
+            ingredient,
+            f"{int(item['Quantity'])}" if item["Quantity"].is_integer() else f"{item['Quantity']:.2f}",
+            item["Unit"],
+            f"€{item['Cost']:.2f}",
+        ]
+        for ingredient, item in grocery_list.items()
+    ]
+
+    # Right-align every column to its widest entry
+    widths = [max(len(cell) for cell in column) for column in zip(headers, *rows)]
 
     print("\nConsolidated Grocery List with Costs:")
-    print(dataframe.to_string(index=False))
+    for row in [headers, *rows]:
+        print(" ".join(cell.rjust(width) for cell, width in zip(row, widths)))
 
 def main():
     print("Welcome to the Smart Grocery List Generator!")
-    dishes = []
+    entered_dishes = []
 
     while True:
         new_dish = input("Enter a dish name: ").strip()
@@ -235,19 +313,24 @@ def main():
             print("Invalid input. Please enter a valid dish name instead of 'yes' or 'no'.")
             continue
 
-        validated_dish = None
-        while validated_dish is None:  # Keep asking until valid input is provided
-            validated_dish = validate_input(new_dish.strip())
-            if validated_dish is None:
-                new_dish = input("Re-enter the dish name: ").strip()
-
-        dishes.append(validated_dish)
-        print(f"Added '{validated_dish}' to your list.")
+        entered_dishes.append(new_dish)
 
         finished = input("Have you finished? Type 'yes' to continue or 'no' to add more dishes: ").strip().lower()
         if finished == "yes":
             break
 
+    # Validate all dishes at once, then re-prompt only for the ones that failed
+    print("\nValidating dishes...")
+    dishes = []
+    for new_dish, search_result in zip(entered_dishes, search_meals_parallel(entered_dishes)):
+        validated_dish = validate_input(new_dish, search_result)  # Report results in input order
+        while validated_dish is None:  # Keep asking until valid input is provided
+            new_dish = input(f"Re-enter the dish name for '{new_dish}': ").strip()
+            validated_dish = validate_input(new_dish)
+
+        dishes.append(validated_dish)
+        print(f"Added '{validated_dish}' to your list.")
+
     dietary_filter = input("Do you have any dietary preferences? (e.g., vegan, gluten-free): ").strip().lower()
     if dietary_filter not in dietary_filters:
         dietary_filter = None